@@ -1,13 +1,20 @@
 from __future__ import annotations
 
-from collections import defaultdict
+import re
 from dataclasses import dataclass
 from enum import StrEnum, auto
-from tempfile import NamedTemporaryFile
-from typing import AsyncIterable, Iterable
+from functools import lru_cache
+from itertools import groupby
+from os.path import splitext
+from typing import AsyncIterable, Coroutine, Iterable
 
+from delocate.fuse import fuse_wheels
+
+from ._fswalk import _walkFast
+from ._signing import _isSignable
 from ._spawnutil import c, parallel
-from twisted.internet.defer import Deferred
+from twisted.internet.defer import Deferred, gatherResults
+from twisted.internet.threads import deferToThread
 from twisted.python.filepath import FilePath
 from twisted.python.procutils import which
 from wheel_filename import ParsedWheelFilename, parse_wheel_filename
@@ -30,18 +37,30 @@ class PlatformSpecifics:
     architecture: KnownArchitecture
 
 
+_platformTag = re.compile(r"^(\w+)_(\d+)_(\d+)_(\w+)$")
+_architecturesByTag = {each.value: each for each in KnownArchitecture}
+
+
+@lru_cache(maxsize=4096)
+def _parseCached(basename: str) -> ParsedWheelFilename:
+    """
+    Parse a wheel filename, remembering the result; the same basenames come
+    up repeatedly within a run.
+    """
+    return parse_wheel_filename(basename)
+
+
 def specifics(pwf: ParsedWheelFilename) -> Iterable[PlatformSpecifics]:
     """
     Extract platform specific information from the given wheel.
     """
     for tag in pwf.platform_tags:
-        splitted = tag.split("_", 3)
-        if len(splitted) != 4:
+        matched = _platformTag.match(tag)
+        if matched is None:
             continue
-        os, major, minor, arch = splitted
-        try:
-            parsedArch = KnownArchitecture(arch)
-        except ValueError:
+        os, major, minor, arch = matched.groups()
+        parsedArch = _architecturesByTag.get(arch)
+        if parsedArch is None:
             continue
         yield PlatformSpecifics(os, int(major), int(minor), parsedArch)
 
@@ -58,11 +77,71 @@ def wheelNameArchitecture(pwf: ParsedWheelFilename) -> KnownArchitecture:
     return allSpecifics[0].architecture
 
 
-@dataclass
-class FusedPair:
-    arm64: FilePath[str] | None = None
-    x86_64: FilePath[str] | None = None
-    universal2: FilePath[str] | None = None
+def _fusedWheelName(pwf: ParsedWheelFilename) -> str:
+    """
+    The filename a wheel will have once it has been fused into a universal2
+    wheel, reconstructed from its parsed structure rather than by string
+    surgery on the original name.
+    """
+    platformTags = []
+    for tag in pwf.platform_tags:
+        matched = _platformTag.match(tag)
+        if matched is not None:
+            os, major, minor, arch = matched.groups()
+            tag = f"{os}_{major}_{minor}_{KnownArchitecture.universal2.value}"
+        platformTags.append(tag)
+    pieces = [pwf.project, pwf.version]
+    if pwf.build is not None:
+        pieces.append(pwf.build)
+    pieces.append(".".join(pwf.python_tags))
+    pieces.append(".".join(pwf.abi_tags))
+    pieces.append(".".join(platformTags))
+    return "-".join(pieces) + ".whl"
+
+
+# Thin (single-architecture) Mach-O magic numbers, 32- and 64-bit, in both
+# byte orders; fat binaries begin with 0xCAFEBABE / 0xCAFEBABF instead.  See
+# /usr/share/file/magic/mach.
+_singleArchMagics = {0xFEEDFACE, 0xFEEDFACF, 0xCEFAEDFE, 0xCFFAEDFE}
+
+
+def _hasSingleArchHeader(pathStr: str) -> bool:
+    """
+    Does the file at the given path begin with a thin Mach-O header?
+    """
+    # Only the header matters; don't slurp whole binaries.
+    with open(pathStr, "rb") as f:
+        header = f.read(16)
+    if len(header) < 4:
+        return False
+    return int.from_bytes(header[:4], "big") in _singleArchMagics
+
+
+def _couldBeMachO(pathStr: str, name: str) -> bool:
+    """
+    Could this plausibly be a Mach-O file, judging only by its name?  Only
+    shared objects, dylibs, static archives, extensionless executables, and
+    framework binaries can be; the vast majority of bundle entries (.py,
+    .pyc, plists, images) cannot, so filtering by name avoids even opening
+    them.
+    """
+    if ".framework/Versions/" in pathStr:
+        return True
+    suffix = splitext(name)[-1]
+    if suffix in {".so", ".dylib", ".a"}:
+        return True
+    return suffix == "" and not name.startswith(".")
+
+
+def _isPrebuiltStub(binary: FilePath[str]) -> bool:
+    """
+    Is this one of py2app's prebuilt executable stubs, which are expected to
+    be single-architecture?
+    """
+    return (
+        binary.basename() in {"main-x86_64", "main-arm64"}
+        and binary.parent().basename() == "prebuilt"
+    )
 
 
 async def findSingleArchitectureBinaries(
@@ -73,31 +152,22 @@ async def findSingleArchitectureBinaries(
     those that will not run on an older Mac because they're fat binary).
     """
     checkedSoFar = 0
+    for path in paths:
+        for eachPath, isSymlink, isFile, name in _walkFast(path.path):
+            if isSymlink or not isFile:
+                continue
+            if not _couldBeMachO(eachPath, name):
+                continue
+            checkedSoFar += 1
+            if (checkedSoFar % 1000) == 0:
+                print("?", end="", flush=True)
+            if _hasSingleArchHeader(eachPath):
+                yield FilePath(eachPath)
 
-    async def checkOne(path: FilePath[str]) -> tuple[FilePath[str], bool]:
-        """
-        Check the given path for a single-architecture binary, returning True
-        if it is one and False if not.
-        """
-        nonlocal checkedSoFar
-        if path.islink():
-            return path, False
-        if not path.isfile():
-            return path, False
-        checkedSoFar += 1
-        # universal binaries begin "Mach-O universal binary with 2 architectures"
-        if (checkedSoFar % 1000) == 0:
-            print("?", end="", flush=True)
-        isSingle = (await c.file("-b", path.path, quiet=True)).output.startswith(
-            b"Mach-O 64-bit bundle"
-        )
-        return path, isSingle
 
-    async for eachPath, isSingleBinary in parallel(
-        (checkOne(subpath) for path in paths for subpath in path.walk()), 16
-    ):
-        if isSingleBinary:
-            yield eachPath
+# A pinnable "name==version" line from 'pip freeze': not an editable (-e)
+# install, and no ":" or "/" as a URL or path reference would have.
+_freezeAccept = re.compile(rb"^(?!-e)[^:/\n]+$", re.MULTILINE)
 
 
 async def fixArchitectures() -> None:
@@ -109,73 +179,81 @@ async def fixArchitectures() -> None:
     requires the ability to run C{pip} under both architectures.
     """
     downloadDir = ".wheels/downloaded"
-    tmpDir = ".wheels/tmp"
     fusedDir = ".wheels/fused"
 
-    output = (await c.pip("freeze")).output.decode("utf-8")
-    with NamedTemporaryFile(delete=False) as f:
-        for line in output.split("\n"):
-            if (":" not in line) and ("/" not in line) and (not line.startswith("-e")):
-                f.write((line + "\n").encode("utf-8"))
-
-    await c.mkdir("-p", downloadDir, fusedDir, tmpDir)
-    for arch in ["arm64", "x86_64"]:
-        await c.arch(
-            f"-{arch}",
-            which("pip")[0],
-            "wheel",
-            "-r",
-            f.name,
-            "-w",
-            downloadDir,
-        )
-
-    needsFusing: defaultdict[tuple[str, str], FusedPair] = defaultdict(FusedPair)
+    frozen = (await c.pip("freeze")).output
+    requirements = [
+        match.group(0).decode("utf-8") for match in _freezeAccept.finditer(frozen)
+    ]
+
+    await c.mkdir("-p", downloadDir, fusedDir)
+    # The two downloads are independent and network-bound, and their wheel
+    # filenames are architecture-disjoint, so run them concurrently.
+    await gatherResults(
+        [
+            Deferred.fromCoroutine(
+                c.arch(
+                    f"-{arch}",
+                    which("pip")[0],
+                    "wheel",
+                    "-w",
+                    downloadDir,
+                    *requirements,
+                    captureOutput=False,
+                )
+            )
+            for arch in ("arm64", "x86_64")
+        ]
+    )
 
+    # every wheel in this list should either be architecture-independent,
+    # universal2, *or* have *both* arm64 and x86_64 versions.
+    specificWheels: list[tuple[str, str, KnownArchitecture, FilePath[str]]] = []
     for child in FilePath(downloadDir).children():
-        # every wheel in this list should either be architecture-independent,
-        # universal2, *or* have *both* arm64 and x86_64 versions.
-        pwf = parse_wheel_filename(child.basename())
+        pwf = _parseCached(child.basename())
         arch = wheelNameArchitecture(pwf)
-        fusedPath = FilePath(fusedDir).child(child.basename())
         if arch == KnownArchitecture.purePython:
-            child.moveTo(fusedPath)
+            child.moveTo(FilePath(fusedDir).child(child.basename()))
             continue
-        # OK we need to fuse a wheel
-        fusor = needsFusing[(pwf.project, pwf.version)]
-        if arch == KnownArchitecture.x86_64:
-            fusor.x86_64 = child
-        if arch == KnownArchitecture.arm64:
-            fusor.arm64 = child
-        if arch == KnownArchitecture.universal2:
-            child.moveTo(fusedPath)
-            fusor.universal2 = fusedPath
-
-    async def fuseOne(name: str, version: str, fusor: FusedPair) -> None:
-        if fusor.universal2 is not None:
-            print(f"{name} has universal2; skipping")
-            return
-
-        left = fusor.arm64
+        specificWheels.append((pwf.project, pwf.version, arch, child))
+    specificWheels.sort()
+
+    async def fuseOne(
+        name: str, left: FilePath[str] | None, right: FilePath[str] | None
+    ) -> None:
         if left is None:
-            raise RuntimeError(f"no amd64 architecture for {name}")
-        right = fusor.x86_64
+            raise RuntimeError(f"no arm64 architecture for {name}")
         if right is None:
             raise RuntimeError(f"no x86_64 architecture for {name}")
-        await c["delocate-fuse"](
-            "--verbose", f"--wheel-dir={tmpDir}", left.path, right.path
+        # delocate is a pure-Python library; calling it in a thread skips an
+        # interpreter startup per wheel, and its zip I/O releases the GIL.
+        await deferToThread(
+            fuse_wheels,
+            left.path,
+            right.path,
+            FilePath(fusedDir).child(
+                _fusedWheelName(_parseCached(left.basename()))
+            ).path,
         )
-        moveFrom = FilePath(tmpDir).child(left.basename())
-        # TODO: properly rewrite / unparse structure
-        moveTo = FilePath(fusedDir).child(
-            left.basename().replace("_arm64.whl", "_universal2.whl")
-        )
-        moveFrom.moveTo(moveTo)
 
-    async for each in parallel(
-        fuseOne(name, version, fusor)
-        for ((name, version), fusor) in needsFusing.items()
-    ):
+    def fusions() -> Iterable[Coroutine[Deferred[None], None, None]]:
+        for (name, version), group in groupby(
+            specificWheels, lambda wheel: wheel[:2]
+        ):
+            members = {arch: child for (_, _, arch, child) in group}
+            universal2 = members.get(KnownArchitecture.universal2)
+            if universal2 is not None:
+                # already fused; nothing to schedule.
+                print(f"{name} has universal2; skipping")
+                universal2.moveTo(FilePath(fusedDir).child(universal2.basename()))
+                continue
+            yield fuseOne(
+                name,
+                members.get(KnownArchitecture.arm64),
+                members.get(KnownArchitecture.x86_64),
+            )
+
+    async for each in parallel(fusions()):
         pass
 
     await c.pip(
@@ -184,11 +262,36 @@ async def fixArchitectures() -> None:
         "--find-links",
         fusedDir,
         "--force",
-        "--requirement",
-        f.name,
+        *requirements,
     )
 
 
+def _scanSync(top: FilePath[str]) -> tuple[list[FilePath[str]], list[FilePath[str]]]:
+    signable: list[FilePath[str]] = []
+    singleArch: list[FilePath[str]] = []
+    for eachPath, isSymlink, isFile, name in _walkFast(top.path):
+        if _isSignable(eachPath, name):
+            signable.append(FilePath(eachPath))
+        if isSymlink or not isFile:
+            continue
+        if not _couldBeMachO(eachPath, name):
+            continue
+        if _hasSingleArchHeader(eachPath):
+            singleArch.append(FilePath(eachPath))
+    return signable, singleArch
+
+
+async def scanBundle(
+    top: FilePath[str],
+) -> tuple[list[FilePath[str]], list[FilePath[str]]]:
+    """
+    Walk an application bundle once, returning both the paths that need
+    code-signing and any problematic single-architecture binaries, so that
+    releasing doesn't pay for two full O(files) descents.
+    """
+    return await deferToThread(_scanSync, top)
+
+
 start = Deferred.fromCoroutine
 
 
@@ -199,16 +302,18 @@ async def validateArchitectures(
     Ensure that there are no problematic single-architecture binaries in a
     given directory.
     """
+    if not report:
+        # The caller only wants a yes/no answer, so the first problematic
+        # binary settles it; don't walk the rest of the tree.
+        async for eachBinary in findSingleArchitectureBinaries(paths):
+            if not _isPrebuiltStub(eachBinary):
+                return False
+        return True
     success = True
     async for eachBinary in findSingleArchitectureBinaries(paths):
-        if (
-            eachBinary.basename() in {"main-x86_64", "main-arm64"}
-            and eachBinary.parent().basename() == "prebuilt"
-        ):
-            # py2app prebuilt executable stubs don't count
+        if _isPrebuiltStub(eachBinary):
             continue
-        if report:
-            print()
-            print(eachBinary.path)
+        print()
+        print(eachBinary.path)
         success = False
     return success
@@ -11,12 +11,26 @@ from dataclasses import dataclass
 from twisted.python.filepath import FilePath
 from twisted.python.modules import getModule
 
-from ._signing import notarize, signOneFile, signablePathsIn
-from ._architecture import validateArchitectures, fixArchitectures
+from ._signing import (
+    notarize,
+    signOneFile,
+    signPaths,
+    signablePathsIn,
+    signingPrefix,
+)
+from ._architecture import (
+    _isPrebuiltStub,
+    fixArchitectures,
+    scanBundle,
+    validateArchitectures,
+)
 from ._spawnutil import c, parallel
 from ._zip import createZipFile
 
 
+_signingBatchSize = 64
+
+
 @dataclass
 class AppBuilder:
     """
@@ -39,10 +53,16 @@ class AppBuilder:
         """
         await self.fattenEnvironment()
         await self.build()
-        archOK = await validateArchitectures([self.originalAppPath()], True)
-        if not archOK:
+        # One walk of the bundle answers both "what needs signing?" and "is
+        # anything still single-architecture?".
+        signablePaths, singleArchBinaries = await scanBundle(self.originalAppPath())
+        problems = [b for b in singleArchBinaries if not _isPrebuiltStub(b)]
+        if problems:
+            for eachBinary in problems:
+                print()
+                print(eachBinary.path)
             raise RuntimeError()
-        await self.signApp()
+        await self.signApp(signablePaths)
         await self.notarizeApp()
 
     async def fattenEnvironment(self) -> None:
@@ -78,7 +98,7 @@ class AppBuilder:
         """
         Just run py2app.
         """
-        await c.python("setup.py", "py2app")
+        await c.python("setup.py", "py2app", captureOutput=False)
 
     async def authenticateForSigning(self, password: str) -> None:
         """
@@ -102,20 +122,32 @@ class AppBuilder:
         """
         return FilePath("./dist").child(self.name + ".app")
 
-    async def signApp(self) -> None:
+    async def signApp(
+        self, signablePaths: list[FilePath[str]] | None = None
+    ) -> None:
         """
-        Find all binary files which need to be signed within the bundle and run
-        C{codesign} to sign them.
+        Find all binary files which need to be signed within the bundle (if
+        the caller has not already scanned for them) and run C{codesign} to
+        sign them.
         """
         top = self.originalAppPath()
+        allPaths = (
+            list(signablePathsIn(top)) if signablePaths is None else signablePaths
+        )
+        prefix = signingPrefix(self.identityHash, self.entitlementsPath)
+        # Batch the inner signatures to amortize codesign's startup cost, but
+        # stay comfortably under ARG_MAX.
+        batches = [
+            allPaths[i : i + _signingBatchSize]
+            for i in range(0, len(allPaths), _signingBatchSize)
+        ]
         async for signResult in parallel(
-            (
-                signOneFile(p, self.identityHash, self.entitlementsPath)
-                for p in signablePathsIn(top)
-            )
+            signPaths(batch, prefix) for batch in batches
         ):
             pass
-        await signOneFile(top, self.identityHash, self.entitlementsPath)
+        # The top-level bundle can only be signed once everything inside it
+        # has been.
+        await signOneFile(top, prefix)
 
     async def notarizeApp(self) -> None:
         """
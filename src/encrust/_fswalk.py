@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import os
+from typing import Iterable
+
+
+def _walkFast(root: str) -> Iterable[tuple[str, bool, bool, str]]:
+    """
+    Walk a directory tree, yielding C{(path, isSymlink, isFile, name)} for
+    every entry beneath C{root}.
+
+    Unlike L{twisted.python.filepath.FilePath.walk}, this uses L{os.scandir},
+    whose L{os.DirEntry} results carry the file type from the directory read
+    itself, so no extra C{stat()} call (or C{FilePath} instance) is needed per
+    entry.
+    """
+    if not os.path.isdir(root):
+        return
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                isSymlink = entry.is_symlink()
+                isDir = (not isSymlink) and entry.is_dir(follow_symlinks=False)
+                isFile = (not isSymlink) and entry.is_file(follow_symlinks=False)
+                yield entry.path, isSymlink, isFile, entry.name
+                if isDir:
+                    stack.append(entry.path)
@@ -1,45 +1,70 @@
 from __future__ import annotations
 
-from typing import Iterable
+from os.path import basename, dirname
+from typing import Iterable, Sequence
 
 from twisted.python.filepath import FilePath
 
+from ._fswalk import _walkFast
 from ._spawnutil import c
 
 
-async def signOneFile(
-    fileToSign: FilePath[str],
-    codesigningIdentity: str,
-    entitlements: FilePath[str],
-) -> None:
+def signingPrefix(
+    codesigningIdentity: str, entitlements: FilePath[str]
+) -> tuple[str, ...]:
     """
-    Code sign a single file.
+    The leading C{codesign} arguments shared by every invocation in a signing
+    run, built once so per-file calls only append their target paths.
     """
-    fileStr = fileToSign.path
-    entitlementsStr = entitlements.path
-    print("✓", end="", flush=True)
-    await c.codesign(
+    return (
         "--sign",
         codesigningIdentity,
         "--entitlements",
-        entitlementsStr,
+        entitlements.path,
         "--force",
         "--options",
         "runtime",
-        fileStr,
     )
 
 
+async def signOneFile(
+    fileToSign: FilePath[str],
+    signPrefix: tuple[str, ...],
+) -> None:
+    """
+    Code sign a single file.
+    """
+    print("✓", end="", flush=True)
+    await c.codesign(*signPrefix, fileToSign.path)
+
+
+async def signPaths(
+    pathsToSign: Sequence[FilePath[str]],
+    signPrefix: tuple[str, ...],
+) -> None:
+    """
+    Code sign a batch of files with a single C{codesign} invocation.
+    """
+    print("✓" * len(pathsToSign), end="", flush=True)
+    await c.codesign(*signPrefix, *(p.path for p in pathsToSign))
+
+
+def _isSignable(pathStr: str, name: str) -> bool:
+    """
+    Does this entry need to be individually code-signed within a bundle?
+    """
+    if name.endswith((".so", ".dylib", ".framework", ".a")):
+        return True
+    return name == "python" and basename(dirname(pathStr)) == "MacOS"
+
+
 def signablePathsIn(topPath: FilePath[str]) -> Iterable[FilePath[str]]:
     """
     What files need to be individually code-signed within a given bundle?
     """
-    for p in topPath.walk():
-        ext = p.splitext()[-1]
-        if ext in {".so", ".dylib", ".framework", ".a"}:
-            yield p
-        elif p.basename() == 'python' and p.parent().basename() == "MacOS":
-            yield p
+    for eachPath, isSymlink, isFile, name in _walkFast(topPath.path):
+        if _isSignable(eachPath, name):
+            yield FilePath(eachPath)
 
 
 async def notarize(
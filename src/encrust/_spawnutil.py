@@ -1,23 +1,27 @@
 from __future__ import annotations
 
-from collections import deque
-from dataclasses import dataclass
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache
 from os import environ
 from typing import (
+    Any,
     AsyncIterable,
-    Awaitable,
+    Callable,
     Coroutine,
-    Deque,
     Iterable,
     Mapping,
     Sequence,
 )
 
 
-from twisted.internet.defer import Deferred, DeferredSemaphore
+from twisted.internet.defer import Deferred, DeferredQueue
 from twisted.internet.error import ProcessDone, ProcessTerminated
+from twisted.internet.fdesc import setNonBlocking
 from twisted.internet.interfaces import IReactorProcess
+from twisted.internet.main import CONNECTION_DONE
 from twisted.internet.protocol import ProcessProtocol
+from twisted.internet.task import deferLater
 from twisted.python.failure import Failure
 from twisted.python.procutils import which
 
@@ -48,13 +52,26 @@ class ProcessResult:
 
 @dataclass
 class InvocationProcessProtocol(ProcessProtocol):
-    def __init__(self, invocation: Invocation, quiet: bool) -> None:
+    def __init__(
+        self, invocation: Invocation, quiet: bool, captureOutput: bool = True
+    ) -> None:
         super().__init__()
         self.invocation = invocation
         self.d = Deferred[int]()
         self.quiet = quiet
-        self.output = b""
-        self.errors = b""
+        self.captureOutput = captureOutput
+        # accumulate chunks and join lazily; bytes += bytes is quadratic in
+        # the total output size.
+        self._outChunks: list[bytes] = []
+        self._errChunks: list[bytes] = []
+
+    @property
+    def output(self) -> bytes:
+        return b"".join(self._outChunks)
+
+    @property
+    def errors(self) -> bytes:
+        return b"".join(self._errChunks)
 
     def show(self, data: bytes) -> None:
         if not self.quiet:
@@ -64,11 +81,13 @@ class InvocationProcessProtocol(ProcessProtocol):
             )
 
     def outReceived(self, outData: bytes) -> None:
-        self.output += outData
+        if self.captureOutput:
+            self._outChunks.append(outData)
         self.show(outData)
 
     def errReceived(self, errData: bytes) -> None:
-        self.errors += errData
+        if self.captureOutput:
+            self._errChunks.append(errData)
         self.show(errData)
 
     def processEnded(self, reason: Failure) -> None:
@@ -76,6 +95,53 @@ class InvocationProcessProtocol(ProcessProtocol):
         self.d.callback(pd.exitCode)
 
 
+@dataclass(eq=False)
+class _PipeReader:
+    """
+    A minimal read descriptor that feeds pipe data to a callback and fires a
+    Deferred at EOF.  (C{eq=False} keeps identity hashing, which the
+    reactor's reader set requires.)
+    """
+
+    reactor: Any
+    fd: int
+    receiver: Callable[[bytes], None]
+    done: Deferred[None] = field(default_factory=Deferred)
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def logPrefix(self) -> str:
+        return "encrust"
+
+    def doRead(self) -> object:
+        data = os.read(self.fd, 1 << 16)
+        if not data:
+            return CONNECTION_DONE
+        self.receiver(data)
+        return None
+
+    def connectionLost(self, reason: Failure) -> None:
+        self.reactor.removeReader(self)
+        os.close(self.fd)
+        self.done.callback(None)
+
+
+async def _reap(reactor: Any, pid: int) -> int:
+    """
+    Wait for the given (already-EOF'd) child to exit without blocking the
+    reactor, since children spawned outside spawnProcess are invisible to
+    Twisted's SIGCHLD handling.
+    """
+    delay = 0.001
+    while True:
+        reapedPid, status = os.waitpid(pid, os.WNOHANG)
+        if reapedPid == pid:
+            return os.waitstatus_to_exitcode(status)
+        await deferLater(reactor, delay)
+        delay = min(delay * 2, 0.1)
+
+
 @dataclass
 class Invocation:
     """
@@ -91,24 +157,82 @@ class Invocation:
         env: Mapping[str, str] = environ,
         quiet: bool = False,
         workingDirectory: str | None = None,
+        captureOutput: bool = True,
+        fastSpawn: bool = True,
     ) -> ProcessResult:
         from twisted.internet import reactor
 
-        ipp = InvocationProcessProtocol(self, quiet)
-        IReactorProcess(reactor).spawnProcess(
-            ipp,
-            self.executable,
-            [self.executable, *self.argv],
-            environ,
-            workingDirectory,
-        )
-        value = await ipp.d
+        ipp = InvocationProcessProtocol(self, quiet, captureOutput)
+        if fastSpawn and workingDirectory is None and hasattr(os, "posix_spawn"):
+            value = await self._fastSpawn(reactor, ipp)
+        else:
+            IReactorProcess(reactor).spawnProcess(
+                ipp,
+                self.executable,
+                [self.executable, *self.argv],
+                environ,
+                workingDirectory,
+            )
+            value = await ipp.d
         if value != 0:
             raise RuntimeError(
                 f"{self.executable} {self.argv} exited with error {value}"
             )
         return ProcessResult(value, ipp.output, self)
 
+    async def _fastSpawn(
+        self, reactor: Any, ipp: InvocationProcessProtocol
+    ) -> int:
+        """
+        Spawn with C{posix_spawn(2)}, which skips the page-table copy that
+        C{fork()} pays in a large parent process; for the thousands of tiny
+        codesign/file-style children this tool runs, that copy dominates.
+        """
+        outRead, outWrite = os.pipe()
+        errRead, errWrite = os.pipe()
+        devNull = os.open(os.devnull, os.O_RDONLY)
+        try:
+            pid = os.posix_spawn(
+                self.executable,
+                [self.executable, *self.argv],
+                environ,
+                file_actions=[
+                    (os.POSIX_SPAWN_DUP2, devNull, 0),
+                    (os.POSIX_SPAWN_DUP2, outWrite, 1),
+                    (os.POSIX_SPAWN_DUP2, errWrite, 2),
+                    (os.POSIX_SPAWN_CLOSE, outRead),
+                    (os.POSIX_SPAWN_CLOSE, errRead),
+                ],
+            )
+        except BaseException:
+            os.close(outRead)
+            os.close(errRead)
+            raise
+        finally:
+            os.close(devNull)
+            os.close(outWrite)
+            os.close(errWrite)
+        readers = [
+            _PipeReader(reactor, outRead, ipp.outReceived),
+            _PipeReader(reactor, errRead, ipp.errReceived),
+        ]
+        for reader in readers:
+            setNonBlocking(reader.fd)
+            reactor.addReader(reader)
+        for reader in readers:
+            await reader.done
+        return await _reap(reactor, pid)
+
+
+@lru_cache(maxsize=None)
+def _which(name: str) -> str:
+    """
+    Find (and remember) the full path of a named executable; C{which} walks
+    every C{$PATH} entry with a C{stat()} each time it's called, which adds up
+    over thousands of invocations of the same few commands.
+    """
+    return which(name)[0]
+
 
 @dataclass
 class Command:
@@ -121,7 +245,7 @@ class Command:
 
     def __getitem__(self, argv: str | tuple[str, ...]) -> Invocation:
         """ """
-        return Invocation(which(self.name)[0], argv)
+        return Invocation(_which(self.name), argv)
 
     async def __call__(
         self,
@@ -129,11 +253,17 @@ class Command:
         env: Mapping[str, str] = environ,
         quiet: bool = False,
         workingDirectory: str | None = None,
+        captureOutput: bool = True,
     ) -> ProcessResult:
         """
         Immedately run.
         """
-        return await self[args](env=env, quiet=quiet, workingDirectory=workingDirectory)
+        return await self[args](
+            env=env,
+            quiet=quiet,
+            workingDirectory=workingDirectory,
+            captureOutput=captureOutput,
+        )
 
 
 @dataclass
@@ -154,38 +284,67 @@ class SyntaxSugar:
 
     def __getattr__(self, name) -> Command:
         """ """
-        return Command(name)
+        # cache on the instance so later lookups bypass __getattr__ entirely
+        command = Command(name)
+        object.__setattr__(self, name, command)
+        return command
 
 
 # from twisted.internet import reactor
 c = SyntaxSugar()
 
 
+_stop = object()
+
+
 async def parallel(
     work: Iterable[Coroutine[Deferred[T], T, R]], parallelism: int = 10
 ) -> AsyncIterable[R]:
     """
-    Perform the given work with a limited level of parallelism.
-    """
-    sem = DeferredSemaphore(parallelism)
-    values: Deque[R] = deque()
+    Perform the given work with a limited level of parallelism, yielding
+    results as they complete.
 
-    async def saveAndRelease(coro: Awaitable[R]) -> None:
-        try:
-            values.append(await coro)
-        finally:
-            sem.release()
-
-    async def drain() -> AsyncIterable[R]:
-        await sem.acquire()
-        while values:
-            yield values.popleft()
-
-    for w in work:
-        async for each in drain():
-            yield each
-        Deferred.fromCoroutine(saveAndRelease(w))
-
-    for x in range(parallelism):
-        async for each in drain():
-            yield each
+    A fixed pool of C{parallelism} worker coroutines pulls work from a shared
+    queue, so there is no per-item semaphore round-trip and slow items don't
+    hold back results that are already done.
+    """
+    todo: DeferredQueue[object] = DeferredQueue()
+    done: DeferredQueue[tuple[Failure | None, R | None]] = DeferredQueue()
+
+    async def worker() -> None:
+        while True:
+            item = await todo.get()
+            if item is _stop:
+                return
+            try:
+                done.put((None, await item))  # type:ignore[misc]
+            except Exception:
+                done.put((Failure(), None))
+
+    for _ in range(parallelism):
+        Deferred.fromCoroutine(worker())
+
+    outstanding = 0
+
+    def emit(completed: tuple[Failure | None, R | None]) -> R:
+        failure, result = completed
+        if failure is not None:
+            failure.raiseException()
+        return result  # type:ignore[return-value]
+
+    try:
+        for w in work:
+            todo.put(w)
+            outstanding += 1
+            # Keep the backlog bounded; surface results while producing.
+            while len(todo.pending) > parallelism:
+                result = emit(await done.get())
+                outstanding -= 1
+                yield result
+        while outstanding:
+            result = emit(await done.get())
+            outstanding -= 1
+            yield result
+    finally:
+        for _ in range(parallelism):
+            todo.put(_stop)
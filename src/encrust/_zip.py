@@ -1,20 +1,110 @@
 from __future__ import annotations
 
+import os
+from shutil import copyfileobj
+from stat import S_IFLNK
+from struct import pack
+from time import localtime
+from zipfile import ZIP_STORED, ZipFile, ZipInfo
 
+from twisted.internet.threads import deferToThread
 from twisted.python.filepath import FilePath
 
-from ._spawnutil import c
+from ._fswalk import _walkFast
+
+_appleDoubleMagic = 0x00051607
+_appleDoubleVersion = 0x00020000
+_resourceForkID = 2
+_finderInfoID = 9
+
+
+def _appleDouble(finderInfo: bytes, resourceFork: bytes) -> bytes:
+    """
+    Build a minimal AppleDouble blob (as ditto's C{--sequesterRsrc} would
+    place under C{__MACOSX/}) carrying the given Finder info and resource
+    fork.
+    """
+    entries = []
+    if finderInfo:
+        entries.append((_finderInfoID, finderInfo[:32].ljust(32, b"\0")))
+    if resourceFork:
+        entries.append((_resourceForkID, resourceFork))
+    offset = 26 + 12 * len(entries)
+    blob = pack(
+        ">II16sH", _appleDoubleMagic, _appleDoubleVersion, b"Mac OS X", len(entries)
+    )
+    payload = b""
+    for entryID, data in entries:
+        blob += pack(">III", entryID, offset, len(data))
+        offset += len(data)
+        payload += data
+    return blob + payload
+
+
+def _sequestered(pathStr: str) -> bytes:
+    """
+    Collect any resource fork / Finder info for the given path as an
+    AppleDouble blob, or C{b""} if there is none (or this platform's C{os}
+    module can't read extended attributes).
+    """
+    if not hasattr(os, "listxattr"):
+        return b""
+    try:
+        names = os.listxattr(pathStr, follow_symlinks=False)
+    except OSError:
+        return b""
+    finderInfo = resourceFork = b""
+    if "com.apple.FinderInfo" in names:
+        finderInfo = os.getxattr(pathStr, "com.apple.FinderInfo", follow_symlinks=False)
+    if "com.apple.ResourceFork" in names:
+        resourceFork = os.getxattr(
+            pathStr, "com.apple.ResourceFork", follow_symlinks=False
+        )
+    if finderInfo or resourceFork:
+        return _appleDouble(finderInfo, resourceFork)
+    return b""
+
+
+def _zipInfo(arcname: str, st: os.stat_result) -> ZipInfo:
+    info = ZipInfo(arcname, localtime(st.st_mtime)[:6])
+    info.create_system = 3  # unix, so permission bits are honored
+    info.external_attr = (st.st_mode & 0xFFFF) << 16
+    return info
+
+
+def _zipSync(zipPath: str, dirPath: str) -> None:
+    """
+    Synchronously archive C{dirPath} (including itself, as ditto's
+    C{--keepParent} does) into a stored zip at C{zipPath}, preserving
+    symlinks, permissions, and sequestered resource forks.
+
+    Stored rather than deflated: notarization uploads are compressed on the
+    wire anyway, and Mach-O binaries barely compress.
+    """
+    parent = os.path.dirname(dirPath)
+    with ZipFile(zipPath, "w", ZIP_STORED, allowZip64=True) as zf:
+        for eachPath, isSymlink, isFile, name in _walkFast(dirPath):
+            arcname = os.path.relpath(eachPath, parent)
+            st = os.lstat(eachPath)
+            if isSymlink:
+                info = _zipInfo(arcname, st)
+                info.external_attr |= S_IFLNK << 16
+                zf.writestr(info, os.readlink(eachPath))
+                continue
+            if not isFile:
+                zf.writestr(_zipInfo(arcname + "/", st), b"")
+                continue
+            info = _zipInfo(arcname, st)
+            with open(eachPath, "rb") as src:
+                with zf.open(info, "w", force_zip64=True) as dst:
+                    copyfileobj(src, dst, 1 << 20)
+            doubled = _sequestered(eachPath)
+            if doubled:
+                head, tail = os.path.split(arcname)
+                zf.writestr(os.path.join("__MACOSX", head, "._" + tail), doubled)
 
 
 async def createZipFile(zipFile: FilePath, directoryToZip: FilePath) -> None:
-    zipPath = zipFile.asTextMode().path
-    dirPath = directoryToZip.asTextMode()
-    await c.ditto(
-        "-c",
-        "-k",
-        "--sequesterRsrc",
-        "--keepParent",
-        dirPath.basename(),
-        zipPath,
-        workingDirectory=dirPath.dirname(),
+    await deferToThread(
+        _zipSync, zipFile.asTextMode().path, directoryToZip.asTextMode().path
     )